@@ -8,3 +8,7 @@ class ConnectionServerError(Exception):
 
 class NotForSendingError(Exception):
     pass
+
+
+class SendQueueFullError(Exception):
+    pass
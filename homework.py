@@ -1,87 +1,195 @@
 import logging
 import os
+import queue
 import sys
+import threading
 import time
+from concurrent.futures import Future
 from http import HTTPStatus
+from types import MappingProxyType
 
 import requests
-import telegram
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from telegram.error import TelegramError
+from telegram.ext import CommandHandler, Filters, Updater
+from urllib3.util.retry import Retry
+
+try:
+    import orjson as json
+except ImportError:
+    import json
+
 from exceptions import (WrongAPIResponseCodeError,
                         ConnectionServerError,
-                        NotForSendingError)
+                        NotForSendingError,
+                        SendQueueFullError)
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
 
 RETRY_TIME = 600
+MAX_RETRY_TIME = 3600
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
 HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
 
-HOMEWORK_VERDICTS = {
+RETRY = Retry(
+    total=3,
+    backoff_factor=0.3,
+    status_forcelist=(500, 502, 503, 504),
+    allowed_methods=frozenset(['GET']),
+    raise_on_status=False
+)
+SESSION = requests.Session()
+SESSION.headers.update(HEADERS)
+SESSION.mount(
+    'https://',
+    HTTPAdapter(max_retries=RETRY, pool_connections=1, pool_maxsize=2)
+)
+
+VALIDATOR_HEADERS = (
+    ('ETag', 'If-None-Match'),
+    ('Last-Modified', 'If-Modified-Since'),
+)
+NOT_MODIFIED = object()
+VALIDATORS = {}
+
+SEND_QUEUE = queue.Queue(maxsize=16)
+REQUEST_PARAMS = {'from_date': 0}
+PENDING_REQUEST_LOCK = threading.Lock()
+pending_request = None
+
+HOMEWORK_VERDICTS = MappingProxyType({
     'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
     'reviewing': 'Работа взята на проверку ревьюером.',
     'rejected': 'Работа проверена: у ревьюера есть замечания.'
-}
+})
+STATUS_TEMPLATES = MappingProxyType({
+    status: ('Изменился статус проверки работы "', f'". {verdict}')
+    for status, verdict in HOMEWORK_VERDICTS.items()
+})
 
 
 def send_message(bot, message):
-    """Отправляет сообщения в Telegram чат."""
+    """Ставит сообщение в очередь на отправку в Telegram чат."""
     try:
-        logging.info('Начата отправка сообщения')
-        bot.send_message(TELEGRAM_CHAT_ID, message)
-    except NotForSendingError:
-        raise NotForSendingError('Cбой при отправке сообщения в Telegram')
-    else:
-        logging.info('Сообщения успешно отправлено')
+        SEND_QUEUE.put_nowait((bot, message))
+    except queue.Full:
+        raise SendQueueFullError(
+            'Очередь сообщений для отправки в Telegram переполнена'
+        )
+    logger.debug('Сообщение поставлено в очередь на отправку')
 
 
-def get_api_answer(current_timestamp):
+def send_worker(send_queue):
+    """Отправляет сообщения из очереди в Telegram чат."""
+    while True:
+        bot, message = send_queue.get()
+        try:
+            logger.debug('Начата отправка сообщения')
+            bot.send_message(TELEGRAM_CHAT_ID, message)
+        except TelegramError as error:
+            logger.error('Cбой при отправке сообщения в Telegram: %s', error)
+        except Exception as error:
+            logger.error(
+                'Сбой в работе отправки сообщений: %s', error, exc_info=True
+            )
+        else:
+            logger.info('Сообщения успешно отправлено')
+        finally:
+            send_queue.task_done()
+
+
+def request_api_answer(current_timestamp):
     """
     Делает запрос к единственному эндпоинту API-сервиса.
-    Возвращает ответ API.
+    Возвращает ответ API или NOT_MODIFIED, если ответ не изменился.
     """
     timestamp = current_timestamp or int(time.time())
-    request_params = {
-        'url': ENDPOINT,
-        'headers': HEADERS,
-        'params': {'from_date': timestamp}
-    }
+    REQUEST_PARAMS['from_date'] = timestamp
     try:
-        logging.info(
-            (
-                'Начинаем подключение к эндпоинту {url}, с параметрами '
-                'headers = {headers}; params= {params}.'
-            ).format(**request_params)
+        logger.debug(
+            'Начинаем подключение к эндпоинту %s, с параметром from_date=%s.',
+            ENDPOINT, timestamp
         )
-        response = requests.get(**request_params)
-        if response.status_code != HTTPStatus.OK:
-            error = (f'Ответ сервера не является успешным: '
-                     f'{response.status_code}')
-            raise WrongAPIResponseCodeError(error)
-        return response.json()
-    except ConnectionServerError as error:
+        response = SESSION.get(
+            ENDPOINT,
+            params=REQUEST_PARAMS,
+            headers=VALIDATORS,
+            timeout=(5, 30)
+        )
+    except requests.RequestException as error:
         raise ConnectionServerError(
             f'Ошибка при запросе к основному API: {error}'
         )
+    if response.status_code == HTTPStatus.NOT_MODIFIED:
+        return NOT_MODIFIED
+    if response.status_code != HTTPStatus.OK:
+        error = (f'Ответ сервера не является успешным: '
+                 f'{response.status_code}')
+        raise WrongAPIResponseCodeError(error)
+    for response_header, request_header in VALIDATOR_HEADERS:
+        value = response.headers.get(response_header)
+        if value:
+            VALIDATORS[request_header] = value
+        else:
+            VALIDATORS.pop(request_header, None)
+    return json.loads(response.content)
+
+
+def get_api_answer(current_timestamp):
+    """
+    Возвращает ответ API, не допуская параллельных запросов.
+    Если запрос уже выполняется, ожидает и возвращает его результат.
+    """
+    global pending_request
+    with PENDING_REQUEST_LOCK:
+        pending = pending_request
+        is_owner = pending is None
+        if is_owner:
+            pending = pending_request = Future()
+    if not is_owner:
+        return pending.result()
+    try:
+        answer = request_api_answer(current_timestamp)
+    except BaseException as error:
+        pending.set_exception(error)
+        raise
+    else:
+        pending.set_result(answer)
+        return answer
+    finally:
+        with PENDING_REQUEST_LOCK:
+            pending_request = None
 
 
 def check_response(response):
-    """Проверяет ответ API на корректность."""
-    logging.info('Начата проверка ответа сервера')
-    if not isinstance(response, dict):
+    """
+    Проверяет ответ API на корректность.
+    Пустой список домашних работ возвращается сразу: current_date
+    вызывающий код читает из ответа до проверки.
+    """
+    logger.debug('Начата проверка ответа сервера')
+    if type(response) is not dict:
         raise TypeError('response не словарь')
-    homeworks = response.get('homeworks')
-    if not isinstance(homeworks, list):
+    try:
+        homeworks = response['homeworks']
+    except KeyError as error:
         raise NotForSendingError(
+            'Ключ homeworks отсутствует в словаре'
+        ) from error
+    if not isinstance(homeworks, list):
+        raise TypeError(
             f'В ответе от API под ключом "homeworks" пришел не список. '
             f'homeworks = {homeworks}.'
         )
-    if 'homeworks' not in response:
-        raise NotForSendingError('Ключ homeworks отсутствует в словаре')
+    if not homeworks:
+        return homeworks
     if 'current_date' not in response:
         raise NotForSendingError('Ключ current_date отсутствует в словаре')
     return homeworks
@@ -89,18 +197,17 @@ def check_response(response):
 
 def parse_status(homework):
     """Получает статус домашней работы."""
-    if 'homework_name' not in homework:
-        raise KeyError('Ключ homework_name отсутствует в словаре')
     homework_name = homework.get('homework_name')
+    if homework_name is None:
+        raise KeyError('Ключ homework_name отсутствует в словаре')
     homework_status = homework.get('status')
-    if homework_status not in HOMEWORK_VERDICTS:
+    template = STATUS_TEMPLATES.get(homework_status)
+    if template is None:
         raise NotForSendingError(
             f'Отсутствует статус {homework_name} в словаре HOMEWORK_VERDICTS.'
         )
-    verdict = HOMEWORK_VERDICTS.get(homework_status)
-    if not verdict:
-        raise NotForSendingError('Статус домашней работы неизвестен')
-    return f'Изменился статус проверки работы "{homework_name}". {verdict}'
+    prefix, suffix = template
+    return ''.join((prefix, str(homework_name), suffix))
 
 
 def check_tokens():
@@ -108,45 +215,103 @@ def check_tokens():
     return all((PRACTICUM_TOKEN, TELEGRAM_TOKEN, TELEGRAM_CHAT_ID))
 
 
+def check_homework(context):
+    """
+    Проверяет статус домашней работы в задаче JobQueue.
+    Планирует следующую проверку с учётом задержки после сбоев,
+    отсчитывая интервал от начала текущей проверки.
+    """
+    state = context.bot_data
+    started = time.monotonic()
+    timestamp = state['current_timestamp']
+    try:
+        response = get_api_answer(timestamp)
+        if response is NOT_MODIFIED:
+            state['backoff'] = RETRY_TIME
+            logger.debug('Нет новых статусов')
+            return
+        state['current_timestamp'] = response['current_date']
+        new_homeworks = check_response(response)
+        state['backoff'] = RETRY_TIME
+        key = None
+        if new_homeworks:
+            homework = new_homeworks[0]
+            key = (
+                homework.get('id', homework.get('homework_name')),
+                homework.get('status')
+            )
+        if key == state['prev_key']:
+            logger.debug('Нет новых статусов')
+            return
+        if key is None:
+            message = 'Нет домашней работы на проверке'
+        else:
+            message = parse_status(homework)
+        send_message(context.bot, message)
+        state['prev_key'] = key
+        state['last_message'] = message
+    except SendQueueFullError as error:
+        state['current_timestamp'] = timestamp
+        VALIDATORS.clear()
+        logger.error(error)
+    except (NotForSendingError, TypeError, KeyError) as error:
+        state['backoff'] = min(state['backoff'] * 2, MAX_RETRY_TIME)
+        logger.error(error)
+    except Exception as error:
+        state['backoff'] = min(state['backoff'] * 2, MAX_RETRY_TIME)
+        message = f'Сбой в работе программы: {error}'
+        logger.error(message, exc_info=True)
+    finally:
+        deadline = started + state['backoff']
+        context.job_queue.run_once(
+            check_homework, max(0, deadline - time.monotonic())
+        )
+
+
+def owner_chat_filter():
+    """Возвращает фильтр, пропускающий только чат TELEGRAM_CHAT_ID."""
+    if str(TELEGRAM_CHAT_ID).startswith('@'):
+        return Filters.chat(username=TELEGRAM_CHAT_ID)
+    return Filters.chat(chat_id=int(TELEGRAM_CHAT_ID))
+
+
+def status_command(update, context):
+    """Отвечает на команду /status последним известным статусом."""
+    message = context.bot_data['last_message']
+    update.effective_message.reply_text(message or 'Статус ещё не получен')
+
+
 def main():
     """Основная логика работы бота."""
     if not check_tokens():
         error_tokens = 'Отсутствуют токены'
-        logging.critical(error_tokens)
+        logger.critical(error_tokens)
         sys.exit(error_tokens)
-    bot = telegram.Bot(token=TELEGRAM_TOKEN)
-    current_timestamp = int(time.time())
-    current_report = {'name': '', 'message': ''}
-    prev_report = current_report.copy()
-    while True:
-        try:
-            response = get_api_answer(current_timestamp)
-            current_timestamp = response['current_date']
-            new_homeworks = check_response(response)
-            if not new_homeworks:
-                message = 'Нет домашней работы на проверке'
-                current_report['message'] = message
-            else:
-                message = parse_status(new_homeworks[0])
-                current_report['name'] = new_homeworks[0]['homework_name']
-                current_report['message'] = message
-            if current_report != prev_report:
-                send_message(bot, message)
-                prev_report = current_report.copy()
-            else:
-                logging.debug('Нет новых статусов')
-        except (NotForSendingError, TypeError, KeyError) as error:
-            logging.error(error)
-        except (
-            Exception,
-            ConnectionServerError,
-            WrongAPIResponseCodeError
-        ) as error:
-            message = f'Сбой в работе программы: {error}'
-            current_report['message'] = message
-            logging.error(message, exc_info=True)
-        finally:
-            time.sleep(RETRY_TIME)
+    threading.Thread(
+        target=send_worker, args=(SEND_QUEUE,), daemon=True
+    ).start()
+    updater = Updater(
+        token=TELEGRAM_TOKEN,
+        use_context=True,
+        request_kwargs={
+            'connect_timeout': 5.0,
+            'read_timeout': 10.0,
+        }
+    )
+    updater.dispatcher.bot_data.update(
+        current_timestamp=int(time.time()),
+        prev_key=(),
+        last_message='',
+        backoff=RETRY_TIME,
+    )
+    updater.dispatcher.add_handler(CommandHandler(
+        'status',
+        status_command,
+        filters=owner_chat_filter()
+    ))
+    updater.job_queue.run_once(check_homework, 0)
+    updater.start_polling()
+    updater.idle()
 
 
 if __name__ == '__main__':
@@ -1,4 +1,9 @@
+import json
 import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
 from http import HTTPStatus
 
 import requests
@@ -44,6 +49,11 @@ class MockResponseGET:
         )
         self.random_timestamp = random_timestamp
         self.status_code = http_status
+        self.headers = {}
+
+    @property
+    def content(self):
+        return json.dumps(self.json()).encode()
 
     def json(self):
         data = {
@@ -53,6 +63,14 @@ class MockResponseGET:
         return data
 
 
+def patch_session_get(monkeypatch, mock_get):
+    def session_get(session, url, **kwargs):
+        kwargs['headers'] = {**session.headers, **kwargs.get('headers', {})}
+        return mock_get(url, **kwargs)
+
+    monkeypatch.setattr(requests.Session, 'get', session_get)
+
+
 class MockTelegramBot:
 
     def __init__(self, token=None, random_timestamp=None, **kwargs):
@@ -73,6 +91,47 @@ class MockTelegramBot:
         return self.random_timestamp
 
 
+class MockJobQueue:
+
+    def __init__(self):
+        self.scheduled = []
+
+    def run_once(self, callback, when, **kwargs):
+        self.scheduled.append((callback, when))
+
+
+class MockCallbackContext:
+
+    def __init__(self, bot_data):
+        self.bot_data = bot_data
+        self.bot = MockTelegramBot(token='1234:abcdefg')
+        self.job_queue = MockJobQueue()
+
+
+class MockMessage:
+
+    def __init__(self):
+        self.replies = []
+
+    def reply_text(self, text, **kwargs):
+        self.replies.append(text)
+
+
+class MockUpdate:
+
+    def __init__(self):
+        self.effective_message = MockMessage()
+
+
+def patch_monotonic(monkeypatch, *values):
+    clock = list(values)
+
+    def monotonic():
+        return clock.pop(0) if len(clock) > 1 else clock[0]
+
+    monkeypatch.setattr(time, 'monotonic', monotonic)
+
+
 class TestHomework:
     HOMEWORK_STATUSES = {
         'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
@@ -186,7 +245,7 @@ class TestHomework:
                 current_timestamp=current_timestamp, **kwargs
             )
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
+        patch_session_get(monkeypatch, mock_response_get)
 
         import homework
 
@@ -232,7 +291,7 @@ class TestHomework:
             response.json = json_invalid
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_500_response_get)
+        patch_session_get(monkeypatch, mock_500_response_get)
 
         import homework
 
@@ -315,7 +374,7 @@ class TestHomework:
             response.json = valid_response_json
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
+        patch_session_get(monkeypatch, mock_response_get)
 
         import homework
 
@@ -352,7 +411,7 @@ class TestHomework:
             response.json = valid_response_json
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
+        patch_session_get(monkeypatch, mock_response_get)
 
         import homework
 
@@ -400,7 +459,7 @@ class TestHomework:
             response.json = valid_response_json
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
+        patch_session_get(monkeypatch, mock_response_get)
 
         import homework
 
@@ -448,7 +507,7 @@ class TestHomework:
             response.json = valid_response_json
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
+        patch_session_get(monkeypatch, mock_response_get)
 
         import homework
 
@@ -484,7 +543,7 @@ class TestHomework:
             response.json = json_invalid
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_no_homeworks_response_get)
+        patch_session_get(monkeypatch, mock_no_homeworks_response_get)
 
         import homework
 
@@ -525,7 +584,7 @@ class TestHomework:
             response.json = valid_response_json
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
+        patch_session_get(monkeypatch, mock_response_get)
 
         import homework
 
@@ -565,7 +624,7 @@ class TestHomework:
             response.json = valid_response_json
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
+        patch_session_get(monkeypatch, mock_response_get)
 
         import homework
 
@@ -599,7 +658,7 @@ class TestHomework:
             response.json = json_invalid
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_empty_response_get)
+        patch_session_get(monkeypatch, mock_empty_response_get)
 
         import homework
 
@@ -626,7 +685,7 @@ class TestHomework:
             )
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
+        patch_session_get(monkeypatch, mock_response_get)
 
         import homework
 
@@ -640,3 +699,424 @@ class TestHomework:
                 f'Убедитесь, что в функции `{func_name}` обрабатываете ситуацию, '
                 'когда API возвращает код, отличный от 200'
             )
+
+    def check_homework_context(self, homework, monkeypatch, answer,
+                               **bot_data):
+        sent = []
+        monkeypatch.setattr(homework, 'get_api_answer', answer)
+        monkeypatch.setattr(
+            homework, 'send_message',
+            lambda bot, message: sent.append(message)
+        )
+        state = {
+            'current_timestamp': 0,
+            'prev_key': (),
+            'last_message': '',
+            'backoff': homework.RETRY_TIME,
+        }
+        state.update(bot_data)
+        return MockCallbackContext(state), sent
+
+    def test_check_homework_sends_new_status(self, monkeypatch,
+                                             random_timestamp):
+        import homework
+
+        def answer(current_timestamp):
+            return {
+                'homeworks': [
+                    {'id': 1, 'homework_name': 'hw123', 'status': 'approved'}
+                ],
+                'current_date': random_timestamp
+            }
+
+        context, sent = self.check_homework_context(
+            homework, monkeypatch, answer, backoff=homework.MAX_RETRY_TIME
+        )
+        patch_monotonic(monkeypatch, 100.0, 103.0)
+        homework.check_homework(context)
+
+        assert len(sent) == 1 and sent[0].endswith(
+            self.HOMEWORK_STATUSES['approved']
+        ), (
+            'Проверьте, что `check_homework` отправляет новый статус'
+        )
+        state = context.bot_data
+        assert state['prev_key'] == (1, 'approved')
+        assert state['last_message'] == sent[0]
+        assert state['current_timestamp'] == random_timestamp
+        assert state['backoff'] == homework.RETRY_TIME, (
+            'Проверьте, что после успешного запроса задержка сбрасывается'
+        )
+        assert context.job_queue.scheduled == [
+            (homework.check_homework, homework.RETRY_TIME - 3.0)
+        ], (
+            'Проверьте, что следующая проверка планируется с учётом '
+            'времени, потраченного на текущую'
+        )
+
+    def test_check_homework_skips_known_status(self, monkeypatch,
+                                               random_timestamp):
+        import homework
+
+        def answer(current_timestamp):
+            return {
+                'homeworks': [
+                    {'id': 1, 'homework_name': 'hw123', 'status': 'approved'}
+                ],
+                'current_date': random_timestamp
+            }
+
+        context, sent = self.check_homework_context(
+            homework, monkeypatch, answer, prev_key=(1, 'approved')
+        )
+        patch_monotonic(monkeypatch, 100.0)
+        homework.check_homework(context)
+
+        assert not sent, (
+            'Проверьте, что `check_homework` не отправляет повторно '
+            'уже известный статус'
+        )
+        assert context.job_queue.scheduled == [
+            (homework.check_homework, homework.RETRY_TIME)
+        ]
+
+    def test_check_homework_backoff_on_failure(self, monkeypatch):
+        import homework
+        from exceptions import ConnectionServerError
+
+        def answer(current_timestamp):
+            raise ConnectionServerError('API недоступен')
+
+        context, sent = self.check_homework_context(
+            homework, monkeypatch, answer, current_timestamp=42
+        )
+        patch_monotonic(monkeypatch, 100.0)
+        homework.check_homework(context)
+        homework.check_homework(context)
+
+        assert not sent
+        assert context.bot_data['current_timestamp'] == 42
+        assert context.job_queue.scheduled == [
+            (homework.check_homework, homework.RETRY_TIME * 2),
+            (homework.check_homework, homework.RETRY_TIME * 4),
+        ], (
+            'Проверьте, что после сбоя задержка перед следующей '
+            'проверкой удваивается'
+        )
+
+        for _ in range(5):
+            homework.check_homework(context)
+        assert context.bot_data['backoff'] == homework.MAX_RETRY_TIME, (
+            'Проверьте, что задержка не превышает MAX_RETRY_TIME'
+        )
+
+    def test_get_api_answer_conditional_request(self, monkeypatch,
+                                                random_timestamp,
+                                                current_timestamp):
+        import homework
+
+        responses = [
+            (HTTPStatus.OK, {'ETag': '"v1"', 'Last-Modified': 'Mon'}),
+            (HTTPStatus.NOT_MODIFIED, {}),
+            (HTTPStatus.OK, {'Last-Modified': 'Tue'}),
+            (HTTPStatus.OK, {}),
+        ]
+        sent_headers = []
+
+        def mock_response_get(*args, **kwargs):
+            sent_headers.append(dict(kwargs['headers']))
+            http_status, headers = responses.pop(0)
+            response = MockResponseGET(
+                *args, random_timestamp=random_timestamp,
+                current_timestamp=current_timestamp,
+                http_status=http_status, **kwargs
+            )
+            response.headers = headers
+            return response
+
+        patch_session_get(monkeypatch, mock_response_get)
+        monkeypatch.setattr(homework, 'VALIDATORS', {})
+
+        homework.get_api_answer(current_timestamp)
+        assert homework.get_api_answer(current_timestamp) is (
+            homework.NOT_MODIFIED
+        ), (
+            'Проверьте, что при ответе 304 `get_api_answer` '
+            'возвращает NOT_MODIFIED'
+        )
+        homework.get_api_answer(current_timestamp)
+        homework.get_api_answer(current_timestamp)
+
+        validators = ('If-None-Match', 'If-Modified-Since')
+        sent = [
+            {key: headers.get(key) for key in validators}
+            for headers in sent_headers
+        ]
+        assert sent == [
+            {'If-None-Match': None, 'If-Modified-Since': None},
+            {'If-None-Match': '"v1"', 'If-Modified-Since': 'Mon'},
+            {'If-None-Match': '"v1"', 'If-Modified-Since': 'Mon'},
+            {'If-None-Match': None, 'If-Modified-Since': 'Tue'},
+        ], (
+            'Проверьте, что валидаторы из последнего ответа 200 '
+            'передаются в следующем запросе'
+        )
+        assert 'If-None-Match' not in homework.SESSION.headers
+
+    def test_get_api_answer_coalesces_concurrent_calls(self, monkeypatch):
+        import homework
+
+        calls = []
+        started = threading.Event()
+        release = threading.Event()
+        waiting = threading.Event()
+
+        def request_api_answer(current_timestamp):
+            calls.append(current_timestamp)
+            started.set()
+            release.wait(5)
+            return {'homeworks': [], 'current_date': current_timestamp}
+
+        class WaitingFuture(Future):
+            def result(self, timeout=None):
+                waiting.set()
+                return super().result(timeout)
+
+        monkeypatch.setattr(homework, 'request_api_answer', request_api_answer)
+        monkeypatch.setattr(homework, 'Future', WaitingFuture)
+
+        results = []
+
+        def call(timestamp):
+            results.append(homework.get_api_answer(timestamp))
+
+        first = threading.Thread(target=call, args=(1,))
+        first.start()
+        assert started.wait(5)
+        second = threading.Thread(target=call, args=(1,))
+        second.start()
+        assert waiting.wait(5)
+        release.set()
+        first.join(5)
+        second.join(5)
+
+        assert calls == [1], (
+            'Проверьте, что одновременные запросы выполняются один раз'
+        )
+        assert results[0] is results[1]
+        assert homework.pending_request is None
+
+        homework.get_api_answer(2)
+        assert calls == [1, 2], (
+            'Проверьте, что после завершения запроса следующий '
+            'выполняется заново'
+        )
+
+    def test_get_api_answer_releases_waiters_on_base_exception(
+        self, monkeypatch
+    ):
+        import homework
+
+        def request_api_answer(current_timestamp):
+            raise KeyboardInterrupt
+
+        pending = []
+
+        class RecordingFuture(Future):
+            def __init__(self):
+                super().__init__()
+                pending.append(self)
+
+        monkeypatch.setattr(homework, 'request_api_answer', request_api_answer)
+        monkeypatch.setattr(homework, 'Future', RecordingFuture)
+        try:
+            homework.get_api_answer(1)
+        except KeyboardInterrupt:
+            pass
+        assert pending[0].done(), (
+            'Проверьте, что ожидающие запросы освобождаются при любом '
+            'исключении'
+        )
+        assert homework.pending_request is None
+
+    def test_send_message_queues_message(self, monkeypatch):
+        import homework
+        from exceptions import SendQueueFullError
+
+        send_queue = queue.Queue(maxsize=1)
+        monkeypatch.setattr(homework, 'SEND_QUEUE', send_queue)
+        bot = MockTelegramBot(token='1234:abcdefg')
+
+        homework.send_message(bot, 'first')
+        assert send_queue.get_nowait() == (bot, 'first'), (
+            'Проверьте, что `send_message` ставит сообщение в очередь'
+        )
+        homework.send_message(bot, 'second')
+        try:
+            homework.send_message(bot, 'third')
+        except SendQueueFullError:
+            pass
+        else:
+            assert False, (
+                'Проверьте, что `send_message` сообщает о переполнении '
+                'очереди исключением SendQueueFullError'
+            )
+
+    def test_send_worker_survives_unexpected_error(self):
+        import homework
+
+        sent = []
+
+        class FlakyBot:
+            def send_message(self, chat_id, text):
+                if text == 'broken':
+                    raise RuntimeError('unexpected')
+                sent.append(text)
+
+        send_queue = queue.Queue()
+        bot = FlakyBot()
+        send_queue.put((bot, 'broken'))
+        send_queue.put((bot, 'ok'))
+        threading.Thread(
+            target=homework.send_worker, args=(send_queue,), daemon=True
+        ).start()
+        send_queue.join()
+
+        assert sent == ['ok'], (
+            'Проверьте, что сбой при отправке одного сообщения '
+            'не останавливает отправку следующих'
+        )
+
+    def test_check_homework_keeps_status_on_full_queue(self, monkeypatch,
+                                                       random_timestamp):
+        import homework
+        from exceptions import SendQueueFullError
+
+        def answer(current_timestamp):
+            return {
+                'homeworks': [
+                    {'id': 1, 'homework_name': 'hw123', 'status': 'approved'}
+                ],
+                'current_date': random_timestamp
+            }
+
+        def send_message(bot, message):
+            raise SendQueueFullError('Очередь переполнена')
+
+        context, _ = self.check_homework_context(
+            homework, monkeypatch, answer, current_timestamp=42
+        )
+        monkeypatch.setattr(homework, 'send_message', send_message)
+        patch_monotonic(monkeypatch, 100.0)
+        homework.check_homework(context)
+
+        state = context.bot_data
+        assert state['current_timestamp'] == 42, (
+            'Проверьте, что при переполненной очереди статус будет '
+            'запрошен повторно'
+        )
+        assert state['prev_key'] == ()
+        assert state['backoff'] == homework.RETRY_TIME, (
+            'Проверьте, что переполнение очереди не увеличивает задержку '
+            'опроса API'
+        )
+
+    def test_parse_status_non_str_homework_name(self):
+        import homework
+
+        result = homework.parse_status(
+            {'homework_name': 123, 'status': 'approved'}
+        )
+        assert result == (
+            'Изменился статус проверки работы "123". '
+            + self.HOMEWORK_STATUSES['approved']
+        ), (
+            'Проверьте, что `parse_status` работает с нестроковым '
+            'названием домашней работы'
+        )
+
+    def test_status_command(self):
+        import homework
+
+        context = MockCallbackContext({'last_message': ''})
+        update = MockUpdate()
+        homework.status_command(update, context)
+        context.bot_data['last_message'] = 'Изменился статус'
+        homework.status_command(update, context)
+
+        assert update.effective_message.replies == [
+            'Статус ещё не получен', 'Изменился статус'
+        ], (
+            'Проверьте, что команда /status отвечает последним '
+            'отправленным статусом'
+        )
+
+    def test_status_command_owner_chat_only(self, monkeypatch):
+        import homework
+
+        monkeypatch.setattr(homework, 'TELEGRAM_CHAT_ID', '12345')
+        chat_filter = homework.owner_chat_filter()
+        assert chat_filter.chat_ids == {12345}, (
+            'Проверьте, что /status доступна только чату TELEGRAM_CHAT_ID'
+        )
+
+        monkeypatch.setattr(homework, 'TELEGRAM_CHAT_ID', '@my_channel')
+        chat_filter = homework.owner_chat_filter()
+        assert chat_filter.usernames == {'my_channel'}, (
+            'Проверьте, что TELEGRAM_CHAT_ID вида @channel поддерживается'
+        )
+
+    def test_check_homework_refetches_status_after_full_queue(
+        self, monkeypatch, random_timestamp
+    ):
+        import homework
+        from exceptions import SendQueueFullError
+
+        sent_headers = []
+
+        def mock_response_get(url, params=None, headers=None, **kwargs):
+            sent_headers.append(dict(headers))
+            if headers.get('If-None-Match') == '"v1"':
+                http_status = HTTPStatus.NOT_MODIFIED
+            else:
+                http_status = HTTPStatus.OK
+            response = MockResponseGET(
+                url, params=params, headers=headers,
+                random_timestamp=random_timestamp,
+                current_timestamp=42, http_status=http_status, **kwargs
+            )
+            response.headers = {'ETag': '"v1"'}
+            response.json = lambda: {
+                'homeworks': [
+                    {'id': 1, 'homework_name': 'hw123', 'status': 'approved'}
+                ],
+                'current_date': random_timestamp
+            }
+            return response
+
+        patch_session_get(monkeypatch, mock_response_get)
+        monkeypatch.setattr(homework, 'VALIDATORS', {})
+        monkeypatch.setattr(homework, 'SEND_QUEUE', queue.Queue(maxsize=1))
+        homework.SEND_QUEUE.put_nowait(None)
+        patch_monotonic(monkeypatch, 100.0)
+        context = MockCallbackContext({
+            'current_timestamp': 42,
+            'prev_key': (),
+            'last_message': '',
+            'backoff': homework.RETRY_TIME,
+        })
+
+        homework.check_homework(context)
+        homework.SEND_QUEUE.get_nowait()
+        homework.check_homework(context)
+
+        assert 'If-None-Match' not in sent_headers[1], (
+            'Проверьте, что после переполнения очереди статус '
+            'запрашивается без условных заголовков'
+        )
+        bot, message = homework.SEND_QUEUE.get_nowait()
+        assert message.endswith(self.HOMEWORK_STATUSES['approved']), (
+            'Проверьте, что неотправленный статус отправляется '
+            'при следующей проверке'
+        )
+        assert context.bot_data['prev_key'] == (1, 'approved')